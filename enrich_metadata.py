@@ -1,31 +1,72 @@
-import json
+import collections
+import datetime
+import functools
 import os
+import re
+import numpy as np
+import orjson
 import yfinance as yf
 import pandas as pd
-from rapidfuzz import process, fuzz
+from rapidfuzz import process, fuzz, utils
+from ingest_dunl import SYMBOL_MAP
 
 PROC_DIR = 'data/processed'
 ENRICH_DIR = 'data/enriched'
+CACHE_DIR = 'data/cache'
 os.makedirs(ENRICH_DIR, exist_ok=True)
+os.makedirs(CACHE_DIR, exist_ok=True)
 
-# Yahoo Finance Proxy Map (Still needed for prices as DUNL is ref data only)
-SYMBOL_MAP = {
-    'AAGZU00': 'CL=F',   # Crude
-    'TS01021': 'TI=F',   # Iron Ore
-    'AAIDC00': 'HO=F',   # Fuel Oil
-    'AAGJA00': 'RB=F',   # Gasoline
-    'TS01034': 'MTF=F',  # Coal
-    'WAUSA00': 'ZW=F',   # Wheat
-    'SP500': '^GSPC'     # Index
-}
+# Noise stripped before matching: multi-word phrases via regex, single words via a token filter
+_NOISE_PHRASE_RE = re.compile(r'\b(?:Disport|Port) Charges?\b')
+_NOISE_WORDS = frozenset({'FOB', 'CIF', 'CFR', 'DES', 'Cargo', 'Blend', 'Strip', 'vs'})
+_STRIP_DOTS = str.maketrans('', '', '.')
 
+@functools.lru_cache(maxsize=4096)
 def clean_text(text):
     """Removes noise words to improve matching accuracy"""
-    noise_words = ['FOB', 'CIF', 'CFR', 'DES', 'Port Charge', 'Disport Charge', 'Cargo', 'Blend', 'Strip', 'vs']
-    text = text.replace('.', '')
-    for word in noise_words:
-        text = text.replace(word, '')
-    return text.strip()
+    text = _NOISE_PHRASE_RE.sub('', text.translate(_STRIP_DOTS))
+    return ' '.join(w for w in text.split() if w not in _NOISE_WORDS)
+
+def _sorted_tokens(text):
+    """Normalizes text and sorts its tokens, i.e. the token-sort preprocessing step"""
+    return ' '.join(sorted(utils.default_process(text).split()))
+
+@functools.lru_cache(maxsize=None)
+def _port_index(port_items):
+    """Builds the port lookups once per distinct (id, name) collection"""
+    # Create a lookup dictionary for ports: {Clean_Name: Port_ID}
+    port_lookup = {clean_text(name): pid for pid, name in port_items}
+    port_names = tuple(port_lookup.keys())
+
+    # Token index for the exact-match fast path: {lowercase_token: [(Clean_Name, name_tokens), ...]}
+    port_token_index = collections.defaultdict(list)
+    for name in port_names:
+        name_tokens = frozenset(name.lower().split())
+        for token in name_tokens:
+            port_token_index[token].append((name, name_tokens))
+
+    # Token-sorted port names, aligned with port_names, for fuzzy scoring
+    port_sorted = tuple(_sorted_tokens(name) for name in port_names)
+
+    return port_lookup, port_names, port_token_index, port_sorted
+
+def _exact_port_match(desc_clean, port_token_index):
+    """
+    Returns the port name whose tokens all appear in the description.
+    Returns None when no port, or more than one equally specific port, matches.
+    """
+    desc_tokens = frozenset(desc_clean.lower().split())
+    candidates = {
+        name: len(name_tokens)
+        for token in desc_tokens
+        for name, name_tokens in port_token_index.get(token, ())
+        if name_tokens <= desc_tokens
+    }
+    if not candidates:
+        return None
+    best = max(candidates.values())
+    winners = [name for name, size in candidates.items() if size == best]
+    return winners[0] if len(winners) == 1 else None
 
 def resolve_logistics_links(benchmarks, ports):
     """
@@ -35,54 +76,94 @@ def resolve_logistics_links(benchmarks, ports):
     print("... 🧠 Running Entity Resolution on Locations")
     links = []
     
-    # Create a lookup dictionary for ports: {Clean_Name: Port_ID}
-    port_lookup = {clean_text(p['name']): p['id'] for p in ports}
-    port_names = list(port_lookup.keys())
-
-    for b in benchmarks:
-        # 1. Get the Benchmark Description (e.g., "Gasoil FOB Spore Cargo")
-        desc_clean = clean_text(b['description'])
-        
-        # 2. Fuzzy Match against all Port Names
-        # We use partial_token_sort_ratio to handle mixed word orders
-        match = process.extractOne(
-            desc_clean, 
-            port_names, 
-            scorer=fuzz.partial_token_sort_ratio
+    port_lookup, port_names, port_token_index, port_sorted = _port_index(tuple((p['id'], p['name']) for p in ports))
+
+    if not benchmarks or not port_names:
+        return links
+
+    # 1. Clean every Benchmark Description once (e.g., "Gasoil FOB Spore Cargo")
+    desc_list = [clean_text(b['description']) for b in benchmarks]
+
+    # 2. Fast path: a port name whose every token appears verbatim needs no fuzzy scoring
+    matches = {}  # {benchmark_index: (Clean_Name, score)}
+    unresolved = []
+    for i, desc_clean in enumerate(desc_list):
+        hit = _exact_port_match(desc_clean, port_token_index)
+        if hit is not None:
+            matches[i] = (hit, 100)
+        else:
+            unresolved.append(i)
+
+    # 3. Score the remaining distinct descriptions against all Port Names in one batched call
+    # Benchmarks sharing a cleaned description reuse the same result
+    # Both sides are token-sorted up front, so partial_ratio on them equals
+    # partial_token_sort_ratio without re-sorting the ports for every pair
+    pending = collections.defaultdict(list)  # {desc_clean: [benchmark_index, ...]}
+    for i in unresolved:
+        pending[desc_list[i]].append(i)
+
+    if pending:
+        unique_descs = list(pending.keys())
+        scores = process.cdist(
+            [_sorted_tokens(d) for d in unique_descs],
+            port_sorted,
+            scorer=fuzz.partial_ratio,
+            score_cutoff=80,
+            dtype=np.uint8,
+            workers=-1
         )
-        
-        if match:
-            best_match_name, score, index = match
-            
+        best_idx = scores.argmax(axis=1)
+        best_scores = scores[np.arange(len(unique_descs)), best_idx]
+
+        for desc_clean, index, score in zip(unique_descs, best_idx, best_scores):
             # Threshold: Only link if we are >80% confident
             if score > 80:
-                port_id = port_lookup[best_match_name]
-                print(f"   🔗 Linked '{b['symbol']}' <--> '{best_match_name}' (Score: {score})")
-                
-                links.append({
-                    'from': b['id'],
-                    'to': port_id,
-                    'label': 'Pricing Location', # Visible label on line
-                    'title': f"Match Logic: Found '{best_match_name}' in '{b['description']}'", # Tooltip logic
-                    'arrows': 'to',
-                    'color': {'color': '#64748b', 'opacity': 0.6},
-                    'dashes': True
-                })
+                for i in pending[desc_clean]:
+                    matches[i] = (port_names[index], score)
+
+    for i, b in enumerate(benchmarks):
+        if i not in matches:
+            continue
+        best_match_name, score = matches[i]
+        port_id = port_lookup[best_match_name]
+        print(f"   🔗 Linked '{b['symbol']}' <--> '{best_match_name}' (Score: {score})")
+
+        links.append({
+            'from': b['id'],
+            'to': port_id,
+            'label': 'Pricing Location', # Visible label on line
+            'title': f"Match Logic: Found '{best_match_name}' in '{b['description']}'", # Tooltip logic
+            'arrows': 'to',
+            'color': {'color': '#64748b', 'opacity': 0.6},
+            'dashes': True
+        })
 
     return links
 
 def fetch_market_data():
     print("... 📈 Fetching Market Data")
     tickers = list(SYMBOL_MAP.values())
+    cache_file = os.path.join(CACHE_DIR, f"market_{datetime.date.today():%Y%m%d}.parquet")
     try:
-        data = yf.download(tickers, period="3mo", interval="1d", progress=False)['Close']
+        if os.path.exists(cache_file):
+            # Same-day re-runs read the cached closes instead of hitting Yahoo
+            data = pd.read_parquet(cache_file)
+        else:
+            raw = yf.download(tickers, period="3mo", interval="1d", progress=False, threads=True, group_by='ticker')
+            data = raw.xs('Close', axis=1, level=1)
+            # Only cache a complete fetch; partial failures are retried on the next run
+            if all(t in data.columns for t in tickers) and data[tickers].notna().any().all():
+                data.to_parquet(cache_file)
         data.index = data.index.strftime('%b %d')
         market_history = {"dates": data.index.tolist(), "datasets": {}}
-        
-        for dunl_id, yf_ticker in SYMBOL_MAP.items():
-            if yf_ticker in data.columns:
-                clean_data = data[yf_ticker].fillna(method='ffill').fillna(0).round(2).tolist()
-                market_history["datasets"][dunl_id] = clean_data
+
+        # Fill and round the whole frame at once rather than column by column
+        data = data[[t for t in SYMBOL_MAP.values() if t in data.columns]].ffill().fillna(0).round(2)
+        # Kept as float32 arrays; orjson serializes them natively (OPT_SERIALIZE_NUMPY)
+        market_history["datasets"] = {
+            dunl_id: data[yf_ticker].to_numpy(dtype=np.float32)
+            for dunl_id, yf_ticker in SYMBOL_MAP.items() if yf_ticker in data.columns
+        }
         return market_history
     except Exception as e:
         print(f"Warning: Market data fetch failed ({e}). Using mock data.")
@@ -90,58 +171,65 @@ def fetch_market_data():
 
 def build_knowledge_graph(ports, benchmarks, currencies, dynamic_links):
     print("... 🕸️  Assembling Graph")
-    nodes = []
+    nodes = {} # {node_id: node}, so re-adding a node is a no-op
     edges = [] # Start with dynamic links
     edges.extend(dynamic_links) 
-    
-    existing_nodes = set()
 
     # Add Nodes
     for b in benchmarks:
-        if b['id'] in SYMBOL_MAP:
-            # Benchmark Node
-            nodes.append({
-                'id': b['id'],
-                'label': b['symbol'],
-                'group': 'benchmark',
-                'title': f"<b>{b['description']}</b><br>ID: {b['id']}",
-                'value': 25
-            })
-            existing_nodes.add(b['id'])
-
-            # Commodity Family Node
-            comm_id = b['commodity']
-            if comm_id not in existing_nodes:
-                nodes.append({'id': comm_id, 'label': comm_id, 'group': 'commodity', 'value': 40})
-                existing_nodes.add(comm_id)
-            edges.append({'from': comm_id, 'to': b['id'], 'color': '#f97316'})
-
-            # Currency Link
-            if b['currency'] not in existing_nodes:
-                nodes.append({'id': b['currency'], 'label': b['currency'], 'group': 'currency', 'value': 15})
-                existing_nodes.add(b['currency'])
-            edges.append({'from': b['id'], 'to': b['currency'], 'color': '#10b981', 'length': 50})
+        # Benchmark Node
+        nodes[b['id']] = {
+            'id': b['id'],
+            'label': b['symbol'],
+            'group': 'benchmark',
+            'title': f"<b>{b['description']}</b><br>ID: {b['id']}",
+            'value': 25
+        }
+
+        # Commodity Family Node
+        comm_id = b['commodity']
+        nodes.setdefault(comm_id, {'id': comm_id, 'label': comm_id, 'group': 'commodity', 'value': 40})
+        edges.append({'from': comm_id, 'to': b['id'], 'color': '#f97316'})
+
+        # Currency Link
+        nodes.setdefault(b['currency'], {'id': b['currency'], 'label': b['currency'], 'group': 'currency', 'value': 15})
+        edges.append({'from': b['id'], 'to': b['currency'], 'color': '#10b981', 'length': 50})
 
     # Add Port Nodes (Only if they were linked dynamically)
-    linked_port_ids = set([link['to'] for link in dynamic_links])
+    linked_port_ids = {link['to'] for link in dynamic_links}
     
     for p in ports:
         if p['id'] in linked_port_ids:
-            nodes.append({
+            nodes[p['id']] = {
                 'id': p['id'],
                 'label': p['name'].replace(' Port Charge','').replace(' Disport Charge',''),
                 'group': 'port',
                 'value': 20,
                 'title': f"<b>{p['name']}</b><br>Region: {p['region']}"
-            })
+            }
+
+    return {"nodes": list(nodes.values()), "edges": edges}
 
-    return {"nodes": nodes, "edges": edges}
+def write_payload(path, payload):
+    """
+    Writes the payload one top-level key at a time, so only a single
+    section's serialized bytes are held in memory at once.
+    """
+    with open(path, 'wb') as f:
+        f.write(b'{')
+        for i, (key, value) in enumerate(payload.items()):
+            if i:
+                f.write(b',')
+            f.write(orjson.dumps(key))
+            f.write(b':')
+            f.write(orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY))
+        f.write(b'}')
 
 if __name__ == "__main__":
     # Load Processed Data
-    with open(os.path.join(PROC_DIR, 'ports.json')) as f: ports = json.load(f)
-    with open(os.path.join(PROC_DIR, 'benchmarks.json')) as f: benchmarks = json.load(f)
-    with open(os.path.join(PROC_DIR, 'currencies.json')) as f: currencies = json.load(f)
+    with open(os.path.join(PROC_DIR, 'ports.json'), 'rb') as f: ports = orjson.loads(f.read())
+    with open(os.path.join(PROC_DIR, 'benchmarks.json'), 'rb') as f: benchmarks = orjson.loads(f.read())
+    with open(os.path.join(PROC_DIR, 'currencies.json'), 'rb') as f: currencies = orjson.loads(f.read())
 
     # 1. Resolve Links Dynamically
     dynamic_links = resolve_logistics_links(benchmarks, ports)
@@ -154,12 +242,11 @@ if __name__ == "__main__":
 
     final_payload = {
         "ports": ports,
-        "benchmarks": [b for b in benchmarks if b['id'] in SYMBOL_MAP],
+        "benchmarks": benchmarks,
         "market_data": market_data,
         "graph": graph_data
     }
 
-    with open(os.path.join(ENRICH_DIR, 'dashboard_payload.json'), 'w') as f:
-        json.dump(final_payload, f, indent=2)
+    write_payload(os.path.join(ENRICH_DIR, 'dashboard_payload.json'), final_payload)
     
     print("✅ Enrichment Complete.")
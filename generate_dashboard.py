@@ -1,21 +1,31 @@
-import json
+import orjson
 import os
-from jinja2 import Environment, FileSystemLoader
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
 
 PROC_DIR = 'data/processed'
 TEMPLATE_DIR = 'templates'
 OUTPUT_FILE = 'index.html'
+JINJA_CACHE_DIR = '.jinja_cache'
+os.makedirs(JINJA_CACHE_DIR, exist_ok=True)
 
 def generate():
     print("🎨 Step 3: Rendering Dashboard...")
     
-    with open(os.path.join(PROC_DIR, 'dashboard_data.json')) as f:
-        payload = json.load(f)
+    with open(os.path.join(PROC_DIR, 'dashboard_data.json'), 'rb') as f:
+        payload = orjson.loads(f.read())
+
+    # Serialize once for the JSON island; escape '<' so "</script>" can't close it
+    payload_json = orjson.dumps(payload).decode().replace('<', '\\u003c')
         
-    env = Environment(loader=FileSystemLoader(TEMPLATE_DIR))
+    # Compiled template is cached on disk so re-runs skip lexing/parsing
+    env = Environment(
+        loader=FileSystemLoader(TEMPLATE_DIR),
+        bytecode_cache=FileSystemBytecodeCache(JINJA_CACHE_DIR),
+        auto_reload=False
+    )
     template = env.get_template('dashboard.html')
     
-    html = template.render(payload=payload)
+    html = template.render(payload_json=payload_json)
     
     with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
         f.write(html)
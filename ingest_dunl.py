@@ -1,6 +1,6 @@
 import pandas as pd
 import os
-import json
+import orjson
 
 # Configuration
 RAW_DIR = 'data/raw'
@@ -21,67 +21,81 @@ PORT_COORDINATES = {
     'HOU':     {'lat': 29.7604, 'lng': -95.3698}  # Houston
 }
 
-def clean_dunl_id(url_id):
-    """Extracts ID from DUNL URL string"""
-    if pd.isna(url_id): return ""
-    return url_id.split('/')[-1]
+# Yahoo Finance Proxy Map (Still needed for prices as DUNL is ref data only)
+SYMBOL_MAP = {
+    'AAGZU00': 'CL=F',   # Crude
+    'TS01021': 'TI=F',   # Iron Ore
+    'AAIDC00': 'HO=F',   # Fuel Oil
+    'AAGJA00': 'RB=F',   # Gasoline
+    'TS01034': 'MTF=F',  # Coal
+    'WAUSA00': 'ZW=F',   # Wheat
+    'SP500': '^GSPC'     # Index
+}
 
 def ingest_ports():
     print("... Ingesting Ports")
     # Load your specific CSV filename
-    df = pd.read_csv(os.path.join(RAW_DIR, 'port_Port Charges Location Data.csv'))
-    
-    ports = []
-    for _, row in df.iterrows():
-        pid = clean_dunl_id(row['ID'])
-        # Only keep ports we have coordinates for (for the MVP)
-        if pid in PORT_COORDINATES:
-            ports.append({
-                'id': pid,
-                'name': row.get('port', 'Unknown Port'),
-                'region': row.get('region', 'Global'),
-                'lat': PORT_COORDINATES[pid]['lat'],
-                'lng': PORT_COORDINATES[pid]['lng'],
-                'dunl_uri': row['ID']
-            })
+    df = pd.read_csv(
+        os.path.join(RAW_DIR, 'port_Port Charges Location Data.csv'),
+        engine='pyarrow', usecols=['ID', 'port', 'region']
+    )
+    # Extract ID from DUNL URL string
+    df['id_clean'] = df['ID'].str.rsplit('/', n=1).str[-1].fillna('')
+
+    # Only keep ports we have coordinates for (for the MVP)
+    coords = pd.DataFrame.from_dict(PORT_COORDINATES, orient='index')
+    df = df.merge(coords, left_on='id_clean', right_index=True)
+
+    ports = pd.DataFrame({
+        'id': df['id_clean'],
+        'name': df['port'],
+        'region': df['region'],
+        'lat': df['lat'],
+        'lng': df['lng'],
+        'dunl_uri': df['ID']
+    }).to_dict('records')
     
-    with open(os.path.join(PROC_DIR, 'ports.json'), 'w') as f:
-        json.dump(ports, f, indent=2)
+    with open(os.path.join(PROC_DIR, 'ports.json'), 'wb') as f:
+        f.write(orjson.dumps(ports, option=orjson.OPT_INDENT_2))
 
 def ingest_benchmarks():
     print("... Ingesting Benchmarks")
-    df = pd.read_csv(os.path.join(RAW_DIR, 'symbols _Platts Benchmarks.csv'))
+    df = pd.read_csv(
+        os.path.join(RAW_DIR, 'symbols _Platts Benchmarks.csv'),
+        engine='pyarrow', usecols=['ID', 'symbol', 'description', 'commodity', 'currency', 'uom']
+    )
+    df['id_clean'] = df['ID'].str.rsplit('/', n=1).str[-1].fillna('')
+    # Only keep benchmarks we can price
+    df = df[df['id_clean'].isin(SYMBOL_MAP.keys())]
     
-    benchmarks = []
-    for _, row in df.iterrows():
-        # Clean data
-        benchmarks.append({
-            'id': clean_dunl_id(row['ID']),
-            'symbol': row.get('symbol', 'N/A'),
-            'description': row.get('description', ''),
-            'commodity': row.get('commodity', 'General'),
-            'currency': row.get('currency', 'USD'),
-            'uom': row.get('uom', 'N/A'),
-            'dunl_uri': row['ID']
-        })
+    benchmarks = pd.DataFrame({
+        'id': df['id_clean'],
+        'symbol': df['symbol'],
+        'description': df['description'],
+        'commodity': df['commodity'],
+        'currency': df['currency'],
+        'uom': df['uom'],
+        'dunl_uri': df['ID']
+    }).to_dict('records')
     
-    with open(os.path.join(PROC_DIR, 'benchmarks.json'), 'w') as f:
-        json.dump(benchmarks, f, indent=2)
+    with open(os.path.join(PROC_DIR, 'benchmarks.json'), 'wb') as f:
+        f.write(orjson.dumps(benchmarks, option=orjson.OPT_INDENT_2))
 
 def ingest_currencies():
     print("... Ingesting Currencies")
-    df = pd.read_csv(os.path.join(RAW_DIR, 'currency.csv'))
+    df = pd.read_csv(
+        os.path.join(RAW_DIR, 'currency.csv'),
+        engine='pyarrow', usecols=['ID', 'currencyCode', 'currencyLabel']
+    )
     
-    currencies = []
-    for _, row in df.iterrows():
-        currencies.append({
-            'code': row.get('currencyCode', 'N/A'),
-            'label': row.get('currencyLabel', ''),
-            'dunl_uri': row['ID']
-        })
+    currencies = pd.DataFrame({
+        'code': df['currencyCode'],
+        'label': df['currencyLabel'],
+        'dunl_uri': df['ID']
+    }).to_dict('records')
         
-    with open(os.path.join(PROC_DIR, 'currencies.json'), 'w') as f:
-        json.dump(currencies, f, indent=2)
+    with open(os.path.join(PROC_DIR, 'currencies.json'), 'wb') as f:
+        f.write(orjson.dumps(currencies, option=orjson.OPT_INDENT_2))
 
 if __name__ == "__main__":
     # Ensure you have put the CSV files in data/raw/ before running